@@ -1,12 +1,12 @@
 import streamlit as st
-import requests
+import httpx
 import json
 import os
+import re
+import hashlib
 from datetime import datetime
-from langchain.agents import create_openai_functions_agent, AgentExecutor
-from langchain import hub
+from concurrent.futures import ThreadPoolExecutor, wait
 from langchain_openai import ChatOpenAI
-from composio_langchain import ComposioToolSet
 from dotenv import load_dotenv
 import time
 from langchain.schema import HumanMessage
@@ -15,8 +15,11 @@ from langchain.callbacks.base import BaseCallbackHandler
 # Load environment variables
 load_dotenv()
 
+# Matches parenthesised asides, compiled once for clean_text_content
+_PAREN_RE = re.compile(r'\([^)]*\)')
+
 # Define supported languages
-languages = [
+LANGUAGES = (
     "English", "Hindi", "Gujarati", "Bengali", "Tamil", 
     "Telugu", "Kannada", "Malayalam", "Punjabi", "Marathi", 
     "Urdu", "Assamese", "Odia", "Sanskrit", "Korean", 
@@ -28,7 +31,14 @@ languages = [
     "Romanian", "Bulgarian", "Croatian", "Serbian", "Slovak", 
     "Slovenian", "Estonian", "Latvian", "Lithuanian", "Malay", 
     "Tagalog", "Swahili"
-]
+)
+
+# Extra instructions appended to the custom prompt, one per post variation
+_VARIATION_SUFFIXES = (
+    "",
+    "\n\nMake this version more casual and story-driven.",
+    "\n\nMake this version more data-driven and professional.",
+)
 
 # Streaming callback handler
 class StreamHandler(BaseCallbackHandler):
@@ -39,7 +49,17 @@ class StreamHandler(BaseCallbackHandler):
     
     def on_llm_new_token(self, token: str, **kwargs):
         self.text += token
-        self.container.markdown(self.text)
+        # Without a container the text is only accumulated, for the caller to render
+        if self.container is not None:
+            self.container.markdown(self.text)
+
+# Shared HTTP/2 connection pool so LLM and search calls reuse TCP+TLS sessions
+@st.cache_resource(show_spinner=False)
+def get_http_client():
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+    )
 
 # Initialize the ChatOpenAI model - base instance for caching
 @st.cache_resource
@@ -49,22 +69,28 @@ def get_base_chat_model(api_key):
         base_url="https://api.two.ai/v2",
         model="sutra-v2",
         temperature=0.7,
+        http_client=get_http_client(),
     )
 
-# Create a streaming version of the model with callback handler
-def get_streaming_chat_model(api_key, callback_handler=None):
+# Initialize the GPT-4 model used for post generation - cached per API key.
+# First use happens on a worker thread, which cannot draw a spinner.
+@st.cache_resource(show_spinner=False)
+def get_gpt4_chat_model(api_key):
     return ChatOpenAI(
-        api_key=api_key,
-        base_url="https://api.two.ai/v2",
-        model="sutra-v2",
+        model="gpt-4",
         temperature=0.7,
+        openai_api_key=api_key,
         streaming=True,
-        callbacks=[callback_handler] if callback_handler else None
+        http_client=get_http_client()
     )
 
 # Function to translate content using Sutra
 def translate_content(content, target_language, api_key):
     """Translate content to target language using Sutra"""
+    # Nothing to translate when the target is English
+    if target_language.strip().lower() == "english":
+        return content, None
+    
     if not api_key:
         return None, "Sutra API key is required"
     
@@ -90,76 +116,103 @@ def translate_content(content, target_language, api_key):
     except Exception as e:
         return None, f"Translation failed: {str(e)}"
 
+# Normalize a search query so case and whitespace variants share a cache entry
+def _norm(query):
+    return " ".join(query.lower().split())
+
 # Function to search web content using Serper
-@st.cache_data(ttl=3600)  # Cache for 1 hour
 def search_web_content(query, search_type="search", api_key="", num_results=20):
     """Search web content using Serper API"""
     if not api_key:
         return None, "Serper API key is required"
     
-    url = f"https://google.serper.dev/{search_type}"
-    payload = json.dumps({
-        "q": query,
-        "num": num_results
-    })
-    headers = {
-        'X-API-KEY': api_key,
-        'Content-Type': 'application/json'
-    }
-    
+    # News goes stale within minutes, evergreen web results stay valid for a day
+    cached_search = _search_news if search_type == "news" else _search_organic
     try:
-        response = requests.post(url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status()
-        return response.json(), None
-    except requests.RequestException as e:
+        return cached_search(_norm(query), num_results, api_key), None
+    except (httpx.HTTPError, ValueError) as e:  # ValueError covers a non-JSON response body
         return None, f"Search failed: {str(e)}"
 
+# The st.cache_data helpers in this file raise on failure, so errors are never
+# cached, and leave arguments with a leading underscore (API keys, search
+# results, stream handlers) out of the cache key.
+
+# Function to search the web with Serper - cached for 1 day per normalized query
+@st.cache_data(ttl=86400, show_spinner=False)
+def _search_organic(norm_query, num_results, _api_key):
+    return _fetch_search(norm_query, "search", num_results, _api_key)
+
+# Function to search news with Serper - cached for 5 minutes per normalized query
+@st.cache_data(ttl=300, show_spinner=False)
+def _search_news(norm_query, num_results, _api_key):
+    return _fetch_search(norm_query, "news", num_results, _api_key)
+
+def _fetch_search(norm_query, search_type, num_results, api_key):
+    url = f"https://google.serper.dev/{search_type}"
+    # httpx encodes json= and sets the Content-Type header itself
+    response = get_http_client().post(
+        url,
+        json={"q": norm_query, "num": num_results},
+        headers={'X-API-KEY': api_key},
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()
+
 # Function to clean text content
 def clean_text_content(text):
     """Clean text content by removing unwanted characters and formatting"""
     if not text:
         return text
     
-    # Remove parentheses and their contents
-    import re
-    text = re.sub(r'\([^)]*\)', '', text)
+    # Most search titles and snippets have no parentheses, so skip the regex for them
+    if '(' in text or ')' in text:
+        # Remove parentheses and their contents, then any unbalanced leftovers
+        text = _PAREN_RE.sub('', text).replace('(', '').replace(')', '')
     
     # Remove extra whitespace
-    text = ' '.join(text.split())
-    
-    # Remove any remaining parentheses
-    text = text.replace('(', '').replace(')', '')
-    
-    return text.strip()
+    return ' '.join(text.split())
+
+# Hash search results canonically so identical content maps to the same cache key
+def _content_hash(content_data):
+    content_json = json.dumps(content_data, sort_keys=True).encode()
+    return hashlib.blake2b(content_json, digest_size=16).hexdigest()
 
 # Function to generate LinkedIn post using GPT-4
-def generate_linkedin_post(content_data, custom_prompt="", api_key="", target_language="English"):
-    """Generate LinkedIn post using OpenAI GPT-4"""
+def generate_linkedin_post(content_data, custom_prompt="", api_key="", target_language="English",
+                           stream_handler=None, content_hash=None):
+    """Generate LinkedIn post using OpenAI GPT-4, streaming tokens to stream_handler if given"""
     if not api_key:
         return None, "OpenAI API key is required"
     
-    # Clean target language
-    target_language = target_language.strip()
+    if content_hash is None:
+        content_hash = _content_hash(content_data)
     
+    try:
+        cleaned_content = _cached_generate(
+            content_hash, custom_prompt, api_key, target_language.strip(), content_data, stream_handler
+        )
+        return cleaned_content, None
+    except Exception as e:
+        return None, f"Post generation failed: {str(e)}"
+
+# Function to generate a post with GPT-4 - cached for 1 hour, keyed on content_hash
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_generate(content_hash, custom_prompt, api_key, target_language, _content_data, _stream_handler=None):
     # Extract relevant information from search results
-    content_summary = ""
+    summary_parts = []
     links = []
     
-    if 'organic' in content_data:
-        for item in content_data['organic'][:5]:  # Use top 5 results
-            title = clean_text_content(item.get('title', ''))
-            snippet = clean_text_content(item.get('snippet', ''))
-            content_summary += f"• {title}: {snippet}\n"
-            if item.get('link'):
-                links.append(item['link'])
+    # Top 5 organic results followed by top 3 news items
+    items = _content_data.get('organic', [])[:5] + _content_data.get('news', [])[:3]
+    for item in items:
+        title, snippet, link = item.get('title', ''), item.get('snippet', ''), item.get('link')
+        summary_parts.append(f"• {clean_text_content(title)}: {clean_text_content(snippet)}")
+        if link:
+            links.append(link)
     
-    if 'news' in content_data:
-        for item in content_data['news'][:3]:  # Use top 3 news items
-            title = clean_text_content(item.get('title', ''))
-            snippet = clean_text_content(item.get('snippet', ''))
-            content_summary += f"• {title}: {snippet}\n"
-            if item.get('link'):
-                links.append(item['link'])
+    content_summary = "\n".join(summary_parts)
+    links_text = "\n".join(links[:3])
     
     # LinkedIn post generation prompt
     base_prompt = f"""
@@ -180,25 +233,90 @@ def generate_linkedin_post(content_data, custom_prompt="", api_key="", target_la
     {content_summary}
     
     Relevant links to potentially reference:
-    {chr(10).join(links[:3])}
+    {links_text}
     
     {custom_prompt if custom_prompt else ''}
     
     Generate a LinkedIn post that will engage professional audiences and encourage interaction.
     """
     
-    try:
-        llm = ChatOpenAI(
-            model="gpt-4",
-            temperature=0.7,
-            openai_api_key=api_key
-        )
-        response = llm.invoke(base_prompt)
-        # Clean the generated content
-        cleaned_content = clean_text_content(response.content)
-        return cleaned_content, None
-    except Exception as e:
-        return None, f"Post generation failed: {str(e)}"
+    llm = get_gpt4_chat_model(api_key)
+    config = {"callbacks": [_stream_handler]} if _stream_handler else None
+    response = llm.invoke(base_prompt, config=config)
+    # Clean the generated content
+    return clean_text_content(response.content)
+
+# Function to generate the post variations shown in the UI - not cached itself,
+# since search and generation are each cached and a repeated query reuses both
+def generate_post_variations(search_results, custom_prompt, api_key, target_language, containers=None):
+    """Generate one post per variation style concurrently and return those that succeeded.
+    
+    If containers are given, each post is streamed live into its container.
+    Streamlit elements may only be updated from the script thread, so the
+    workers just accumulate tokens and this thread renders them.
+    """
+    # Clean the custom prompt once for all variations
+    cleaned_custom = clean_text_content(custom_prompt)
+    variation_prompts = [cleaned_custom + suffix for suffix in _VARIATION_SUFFIXES]
+    
+    # Hash the search results once and share it across all variations
+    content_hash = _content_hash(search_results)
+    handlers = [StreamHandler(None) for _ in variation_prompts]
+    with ThreadPoolExecutor(max_workers=len(variation_prompts)) as executor:
+        futures = [
+            executor.submit(generate_linkedin_post, search_results, prompt, api_key, target_language,
+                            handler, content_hash)
+            for prompt, handler in zip(variation_prompts, handlers)
+        ]
+        if containers:
+            # Only re-render a placeholder when new tokens have arrived
+            rendered_lengths = [0] * len(containers)
+            pending = futures
+            while pending:
+                # Tick every 100 ms, but return as soon as all posts are done
+                _, pending = wait(pending, timeout=0.1)
+                for j, (container, handler) in enumerate(zip(containers, handlers)):
+                    text = handler.text
+                    if len(text) > rendered_lengths[j]:
+                        container.markdown(text)
+                        rendered_lengths[j] = len(text)
+            for container in containers:
+                container.empty()
+        generation_results = [future.result() for future in futures]
+    
+    post_variations = []
+    for i, (post_content, post_error) in enumerate(generation_results):
+        if post_content:
+            post_variations.append({
+                'content': post_content,
+                'timestamp': datetime.now(),
+                'variation': f"Variation {i+1}",
+                'language': target_language
+            })
+    return post_variations
+
+# Fetch the agent prompt from LangChain Hub once per process
+@st.cache_resource(show_spinner=False)
+def _get_agent_prompt():
+    # Upload-only dependencies are imported lazily to keep app start-up fast
+    from langchain import hub
+    return hub.pull("hwchase17/openai-functions-agent")
+
+# Look up the Composio LinkedIn tools - cached per Composio key
+@st.cache_resource(show_spinner=False)
+def _get_composio_tools(api_key):
+    from composio_langchain import ComposioToolSet
+    composio_toolset = ComposioToolSet(api_key=api_key)
+    return composio_toolset.get_tools(actions=["LINKEDIN_CREATE_LINKED_IN_POST"])
+
+# Build the LinkedIn upload agent - cached per (OpenAI, Composio) key pair
+@st.cache_resource(show_spinner=False)
+def get_linkedin_agent(openai_key, composio_key):
+    from langchain.agents import create_openai_functions_agent, AgentExecutor
+    llm = ChatOpenAI(openai_api_key=openai_key)
+    tools = _get_composio_tools(composio_key)
+    agent = create_openai_functions_agent(llm, tools, _get_agent_prompt())
+    return AgentExecutor(agent=agent, tools=tools, verbose=False)
 
 # Function to upload to LinkedIn using Composio
 def upload_to_linkedin(post_content, author_urn, api_key):
@@ -207,12 +325,7 @@ def upload_to_linkedin(post_content, author_urn, api_key):
         return None, "Composio API key is required"
     
     try:
-        llm = ChatOpenAI(openai_api_key=openai_api_key)
-        prompt = hub.pull("hwchase17/openai-functions-agent")
-        composio_toolset = ComposioToolSet(api_key=api_key)
-        tools = composio_toolset.get_tools(actions=["LINKEDIN_CREATE_LINKED_IN_POST"])
-        agent = create_openai_functions_agent(llm, tools, prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=False)
+        agent_executor = get_linkedin_agent(openai_api_key, api_key)
         
         # Task configuration
         task = f"""
@@ -305,7 +418,11 @@ linkedin_author_urn = st.sidebar.text_input("LinkedIn Author URN",
 
 # Language selection
 st.sidebar.subheader("🌐 Language Settings")
-selected_language = st.sidebar.selectbox("Select post language:", languages)
+selected_language = st.sidebar.selectbox("Select post language:", LANGUAGES)
+translate_with_sutra = st.sidebar.checkbox(
+    "Translate with Sutra",
+    help="Generate posts in English with GPT-4, then translate them to the selected language with Sutra"
+)
 
 # Search configuration
 st.sidebar.subheader("🔍 Search Settings")
@@ -339,6 +456,8 @@ if st.button("🔍 Search & Generate Posts", type="primary"):
         st.error("Please provide Serper API key in the sidebar")
     elif not openai_api_key:
         st.error("Please provide OpenAI API key in the sidebar")
+    elif translate_with_sutra and selected_language != "English" and not sutra_api_key:
+        st.error("Please provide Sutra API key in the sidebar")
     else:
         with st.spinner("🔍 Searching web content..."):
             # Search web content
@@ -352,36 +471,36 @@ if st.button("🔍 Search & Generate Posts", type="primary"):
                 st.session_state.search_results = search_results
                 
                 with st.spinner("🤖 Generating LinkedIn posts..."):
-                    # Generate multiple post variations
-                    post_variations = []
+                    # Sutra only translates when the target is not English
+                    cleaned_language = clean_text_content(selected_language)
+                    use_sutra = translate_with_sutra and cleaned_language != "English"
+                    
+                    # Generate posts, streaming each into a placeholder
+                    stream_containers = [st.empty() for _ in _VARIATION_SUFFIXES]
+                    post_variations = generate_post_variations(
+                        search_results,
+                        custom_prompt,
+                        openai_api_key,
+                        "English" if use_sutra else cleaned_language,
+                        stream_containers
+                    )
                     
-                    for i in range(3):  # Generate 3 variations
-                        variation_prompt = clean_text_content(custom_prompt)
-                        if i == 1:
-                            variation_prompt += "\n\nMake this version more casual and story-driven."
-                        elif i == 2:
-                            variation_prompt += "\n\nMake this version more data-driven and professional."
-                        
-                        # Generate post in selected language
-                        post_content, post_error = generate_linkedin_post(
-                            search_results, 
-                            variation_prompt, 
-                            openai_api_key,
-                            clean_text_content(selected_language)  # Clean the selected language
-                        )
-                        
-                        if post_content:
-                            post_variations.append({
-                                'content': post_content,
-                                'timestamp': datetime.now(),
-                                'variation': f"Variation {i+1}",
-                                'language': clean_text_content(selected_language)  # Clean the language
-                            })
+                    if use_sutra:
+                        with st.spinner("🌐 Translating posts with Sutra..."):
+                            for post_data in post_variations:
+                                translated, translate_error = translate_content(
+                                    post_data['content'], cleaned_language, sutra_api_key
+                                )
+                                if translate_error:
+                                    st.warning(f"{post_data['variation']} kept in English: {translate_error}")
+                                else:
+                                    post_data['content'] = clean_text_content(translated)
+                                    post_data['language'] = cleaned_language
                     
                     st.session_state.generated_posts = post_variations
                     
                     if post_variations:
-                        st.success(f"✅ Generated {len(post_variations)} post variations in {clean_text_content(selected_language)}!")
+                        st.success(f"✅ Generated {len(post_variations)} post variations in {cleaned_language}!")
                     else:
                         st.error("Failed to generate posts. Please check your API keys and try again.")
 
@@ -407,8 +526,9 @@ if st.session_state.search_results:
         for i, item in enumerate(results['organic'][:3], 1):
             st.write(f"{i}. **{item.get('title', 'No title')}**")
             st.write(f"_{item.get('snippet', 'No snippet')}_")
-            if item.get('link'):
-                st.write(f"🔗 [Read more]({item['link']})")
+            link = item.get('link')
+            if link:
+                st.write(f"🔗 [Read more]({link})")
             st.write("---")
     
     if 'news' in results:
@@ -416,10 +536,11 @@ if st.session_state.search_results:
         for i, item in enumerate(results['news'][:3], 1):
             st.write(f"{i}. **{item.get('title', 'No title')}**")
             st.write(f"_{item.get('snippet', 'No snippet')}_")
-            if item.get('date'):
-                st.write(f"📅 {item['date']}")
-            if item.get('link'):
-                st.write(f"🔗 [Read more]({item['link']})")
+            date, link = item.get('date'), item.get('link')
+            if date:
+                st.write(f"📅 {date}")
+            if link:
+                st.write(f"🔗 [Read more]({link})")
             st.write("---")
 
 # Generated posts section
@@ -428,8 +549,8 @@ if st.session_state.generated_posts:
                unsafe_allow_html=True)
     
     for i, post_data in enumerate(st.session_state.generated_posts):
-        # Clean up language display
-        language_display = clean_text_content(post_data['language'])
+        # Language and content were cleaned when the post was stored
+        language_display = post_data['language']
         with st.expander(f"📄 {post_data['variation']} - {language_display}", expanded=i==0):
             # Editable post content
             edited_content = st.text_area(
@@ -438,12 +559,14 @@ if st.session_state.generated_posts:
                 height=200,
                 key=f"post_edit_{i}"
             )
+            # Stored posts are already cleaned; only user edits need cleaning again
+            cleaned_content = (edited_content if edited_content == post_data['content']
+                               else clean_text_content(edited_content))
             
             col1, col2, col3 = st.columns([1, 1, 2])
             
             with col1:
                 if st.button(f"📋 Copy", key=f"copy_{i}"):
-                    cleaned_content = clean_text_content(edited_content)
                     st.code(cleaned_content, language=None)
                     st.success("✅ Post copied! You can now paste it anywhere.")
             
@@ -462,9 +585,6 @@ if st.session_state.generated_posts:
                     elif not linkedin_author_urn:
                         st.error("Please provide LinkedIn Author URN in the sidebar")
                     else:
-                        # Clean the content before uploading
-                        cleaned_content = clean_text_content(edited_content)
-                        
                         with st.spinner("📤 Uploading to LinkedIn..."):
                             result, upload_error = upload_to_linkedin(
                                 cleaned_content, linkedin_author_urn, composio_api_key